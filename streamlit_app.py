@@ -30,8 +30,10 @@ if not st.session_state.login:
     login_page()
     st.stop()
 
+import heapq
+import numpy as np
 import pandas as pd
-import plotly.express as px
+import pickle
 import re
 from pathlib import Path
 
@@ -53,19 +55,29 @@ def apply_universal_legend(fig):
     return fig
 
 
+# ================= REGEX =================
+RE_SECTOR_RL = re.compile(r'RL(\d)')
+RE_SECTOR_RR = re.compile(r'RR(\d)')
+RE_TRAILING_DIGIT = re.compile(r'(\d+)$')
+RE_LAYER_F1 = re.compile(r'(ME\d*|VE\d*)$')
+RE_LAYER_F2 = re.compile(r'(MF\d*|VF\d*)$')
+RE_LAYER_F3 = re.compile(r'(MV\d*|VV\d*)$')
+RE_DIGITS = re.compile(r'(\d+)')
+
+
 # ================= SMART SECTOR MAP =================
 def map_sector(cell_name):
     name = str(cell_name).upper()
 
-    match_rl = re.search(r'RL(\d)', name)
+    match_rl = RE_SECTOR_RL.search(name)
     if match_rl:
         return f"SEC{match_rl.group(1)}"
 
-    match_rr = re.search(r'RR(\d)', name)
+    match_rr = RE_SECTOR_RR.search(name)
     if match_rr:
         return f"SEC{match_rr.group(1)}"
 
-    match = re.search(r'(\d+)$', name)
+    match = RE_TRAILING_DIGIT.search(name)
     if match:
         last_digit = int(match.group(1)) % 10
         if last_digit in [1,4,7]: return "SEC1"
@@ -81,33 +93,86 @@ def detect_layer(cell):
 
     cell = str(cell).upper()
 
-    if re.search(r'(ME\d*|VE\d*)$', cell):
+    if RE_LAYER_F1.search(cell):
         return "F1"
-    elif re.search(r'(MF\d*|VF\d*)$', cell):
+    elif RE_LAYER_F2.search(cell):
         return "F2"
-    elif re.search(r'(MV\d*|VV\d*)$', cell):
+    elif RE_LAYER_F3.search(cell):
         return "F3"
 
     return None	
 
 
 # ================= SLA ================= 
+SLA_PATH = Path("src/SLA_MASTER.xlsx")
+SLA_CACHE_PATH = SLA_PATH.with_suffix(".pkl")
+# naikkan setiap kali logika parsing di load_sla_master berubah
+SLA_CACHE_VERSION = 1
+
 @st.cache_data
 def load_sla_master():
-    path = Path("src/SLA_MASTER.xlsx")
+    path = SLA_PATH
     if not path.exists():
         return None, None
 
+    # baca excel via openpyxl lambat (detik), jadi hasil parse disimpan
+    # ke pickle dan dipakai lagi selama file excel tidak berubah
+    stat = path.stat()
+    cache_key = (SLA_CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+
+    if SLA_CACHE_PATH.exists():
+        try:
+            with open(SLA_CACHE_PATH, "rb") as f:
+                cached = pickle.load(f)
+            if cached["key"] == cache_key:
+                return cached["kab_df"], cached["target_df"]
+        except Exception as e:
+            print("SLA cache error:", e)
+
     kab_df = pd.read_excel(path, sheet_name="KABUPATEN")
+    # sheet punya baris SiteID berulang -> merge jadi berlipat
+    kab_df = kab_df.drop_duplicates("SiteID")
+    kab_df["KABUPATEN"] = kab_df["KABUPATEN"].astype("category")
     target_df = pd.read_excel(path, sheet_name="KPI Target", header=2)
     target_df.columns = target_df.columns.str.strip().str.lower()
 
     if "band" in target_df.columns:
-        target_df["band"] = target_df["band"].astype(str).str.extract(r'(\d+)')
+        target_df["band"] = target_df["band"].astype(str).str.extract(RE_DIGITS)
+
+    try:
+        with open(SLA_CACHE_PATH, "wb") as f:
+            pickle.dump(
+                {"key": cache_key, "kab_df": kab_df, "target_df": target_df}, f,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+    except OSError as e:
+        print("SLA cache error:", e)
 
     return kab_df, target_df
 
 
+# arah KPI: "min" = target minimum (makin besar makin bagus),
+# "max" = target maksimum (makin kecil makin bagus), None = tidak ada arah bagus/jelek
+KPI_RULE = {
+    "RRC Setup Success Rate (Service)": "min",
+    "ERAB_Setup_Success_Rate_All_New": "min",
+    "Session_Setup_Success_Rate_New": "min",
+    "Session_Abnormal_Release_New": "max",
+    "Intra-Frequency Handover Out Success Rate": "min",
+    "inter_freq_HO": "min",
+    "Radio_Network_Availability_Rate": "min",
+    "UL_INT_PUSCH": "max",
+    "Average_CQI_nonHOME": "min",
+    "SE_New": "min",
+    "DL_Resource_Block_Utilizing_Rate_New": "max",
+    "UL_Resource_Block_Utilizing_Rate_New": "max",
+    "Total_Traffic_Volume_new": None,
+    "Downlink_Traffic_Volume_New": None,
+    "Uplink_Traffic_Volume_New": None,
+    "Active User DL": None,
+}
+
+
 # ================= SLA NORMAL =================
 def get_sla_threshold(df_scope, kpi, target_df):
 
@@ -223,6 +288,71 @@ def get_sla_threshold_band(df_scope, kpi, target_df):
     return None
 
 
+# ================= COMPACT DTYPE =================
+CATEGORY_COLUMNS = ["CELL_NAME", "SITE_ID", "SECTOR_GROUP", "Band", "DATA_RESOLUTION"]
+
+# hanya volume / utilisasi yang boleh float32; KPI yang dinilai SLA tetap float64
+# supaya nilai tepat di target (mis. 90.02) tidak jadi gagal karena presisi
+FLOAT32_COLUMNS = [
+    "Total_Traffic_Volume_new",
+    "Downlink_Traffic_Volume_New",
+    "Uplink_Traffic_Volume_New",
+    "DL_Resource_Block_Utilizing_Rate_New",
+    "UL_Resource_Block_Utilizing_Rate_New",
+    "Active User DL",
+]
+
+def compact_dtypes(df):
+
+    before = df.memory_usage(deep=True)
+    before_dtypes = df.dtypes.astype(str)
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns and pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype("float32")
+
+    for col in df.select_dtypes("integer").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+
+    after = df.memory_usage(deep=True)
+
+    report = pd.DataFrame({
+        "Dtype Before": before_dtypes,
+        "Dtype After": df.dtypes.astype(str),
+        "Before (MB)": before.drop("Index") / 1024**2,
+        "After (MB)": after.drop("Index") / 1024**2,
+    })
+    report["Saving (MB)"] = report["Before (MB)"] - report["After (MB)"]
+    report["Saving (%)"] = 100 * report["Saving (MB)"] / report["Before (MB)"]
+    report.loc["TOTAL"] = [
+        "", "",
+        report["Before (MB)"].sum(),
+        report["After (MB)"].sum(),
+        report["Saving (MB)"].sum(),
+        100 * report["Saving (MB)"].sum() / report["Before (MB)"].sum(),
+    ]
+
+    return df, report.round(3)
+
+
+def numeric_kpis(df, kpis):
+    # KPI di luar list konversi load_data bisa tetap teks (mis. ada "-"),
+    # jadi hanya ambil kolom numerik sebelum agregasi
+    return [k for k in kpis if k in df.columns and pd.api.types.is_numeric_dtype(df[k])]
+
+
+def drop_unused_categories(df):
+    # buang kategori yang tidak terpakai setelah filter site
+    # supaya groupby / legend tidak membawa semua cell
+    for col in df.select_dtypes("category").columns:
+        df[col] = df[col].cat.remove_unused_categories()
+    return df
+
+
 # ================= LOAD DATA =================
 @st.cache_data
 def load_data(file):
@@ -265,7 +395,9 @@ def load_data(file):
         df["DATA_RESOLUTION"] = "Daily"
 
     df.rename(columns={"EUTRANCELLFDD":"CELL_NAME"}, inplace=True)
-    df["SECTOR_GROUP"] = df["CELL_NAME"].apply(map_sector)
+
+    # map_sector cukup dijalankan per cell unik, bukan per baris
+    df["SECTOR_GROUP"] = df["CELL_NAME"].astype("category").map(map_sector)
 
     df["Band"] = (
         df["Band"].astype(str)
@@ -274,9 +406,239 @@ def load_data(file):
         .str.replace("-","", regex=False)
     )
 
-    df["Band"] = df["Band"].str.extract(r'(\d+)')
+    df["Band"] = df["Band"].str.extract(RE_DIGITS)
 
-    return df
+    return compact_dtypes(df)
+
+
+# ================= BUSY HOUR =================
+BH_TRAFFIC_KPI = "Total_Traffic_Volume_new"
+
+def compute_busy_hour(df, level, kpis):
+
+    kpis = [k for k in numeric_kpis(df, kpis) if k != BH_TRAFFIC_KPI]
+
+    # satu pass groupby untuk semua site/cell: KPI rata-rata per jam,
+    # traffic dijumlah supaya busy hour site = jam traffic total tertinggi
+    g = df.groupby([level, "DATE_ID", "Hour_id"], observed=True)
+
+    df_hour = g[kpis].mean()
+    df_hour[BH_TRAFFIC_KPI] = g[BH_TRAFFIC_KPI].sum(min_count=1)
+    df_hour = df_hour.reset_index().dropna(subset=[BH_TRAFFIC_KPI])
+
+    idx = df_hour.groupby([level, "DATE_ID"], observed=True)[BH_TRAFFIC_KPI].idxmax()
+
+    df_bh = (
+        df_hour.loc[idx]
+        .rename(columns={"Hour_id": "BUSY_HOUR"})
+        .reset_index(drop=True)
+    )
+
+    return df_bh
+
+
+def busy_hour_heatmap(df, kpi):
+
+    # jam x hari untuk seluruh selection
+    aggfunc = "sum" if kpi == BH_TRAFFIC_KPI else "mean"
+
+    return df.pivot_table(
+        index="Hour_id",
+        columns="DATE_ID",
+        values=kpi,
+        aggfunc=aggfunc,
+        observed=True
+    ).sort_index()
+
+
+# ================= PERIOD COMPARE =================
+def normalize_kpi_name(name):
+    return str(name).lower().replace("_","").replace(" ","")
+
+
+def build_target_lookup(df, keys, kpis, target_df):
+
+    # target SLA per entity (site / cell / overall) untuk semua KPI sekaligus,
+    # sama seperti get_sla_threshold: ambil target terendah dari semua band
+    if target_df is None or "KABUPATEN" not in df.columns:
+        return None
+
+    target_cols = {normalize_kpi_name(c): c for c in target_df.columns}
+    kpi_cols = {k: target_cols[normalize_kpi_name(k)] for k in kpis if normalize_kpi_name(k) in target_cols}
+
+    if not kpi_cols:
+        return None
+
+    df_target = target_df[["kabupaten","band"] + list(kpi_cols.values())].copy()
+    df_target["kabupaten"] = df_target["kabupaten"].astype(str).str.lower().str.strip()
+    df_target["band"] = df_target["band"].astype(str).str.strip()
+    df_target = df_target.drop_duplicates(["kabupaten","band"])
+    df_target = df_target.rename(columns={v: k for k, v in kpi_cols.items()})
+
+    df_scope = df[keys + ["KABUPATEN","Band"]].drop_duplicates()
+    df_scope["kabupaten"] = df_scope["KABUPATEN"].astype(str).str.lower().str.strip()
+    df_scope["band"] = df_scope["Band"].astype(str).str.strip()
+
+    df_scope = df_scope.merge(df_target, on=["kabupaten","band"], how="inner")
+
+    if df_scope.empty:
+        return None
+
+    if not keys:
+        return df_scope[list(kpi_cols)].min().rename_axis("KPI").rename("TARGET")
+
+    df_scope = df_scope.groupby(keys, observed=True)[list(kpi_cols)].min()
+    df_scope.columns.name = "KPI"
+
+    return df_scope.stack().rename("TARGET")
+
+
+# nilai kritis t two-sided 95% (tanpa scipy); df di antara baris tabel
+# dibulatkan ke bawah supaya tetap konservatif
+T_CRIT_DOF = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 12, 15, 20, 30, 60, 120, np.inf])
+T_CRIT_95 = np.array([
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262,
+    2.228, 2.179, 2.131, 2.086, 2.042, 2.000, 1.980, 1.960
+])
+
+def t_critical(dof):
+    idx = np.searchsorted(T_CRIT_DOF, dof, side="right") - 1
+    crit = T_CRIT_95[np.clip(idx, 0, None)]
+    return np.where(np.isnan(dof) | (dof < 1), np.inf, crit)
+
+
+def compute_period_compare(df, keys, kpis, window_a, window_b, target_df):
+
+    kpis = numeric_kpis(df, kpis)
+
+    if not kpis:
+        return pd.DataFrame(columns=keys + ["KPI","PERIOD_A","PERIOD_B","DELTA","DELTA_%",
+                                            "SIGNIFICANT","TREND","TARGET","SLA_FLAG"])
+
+    # label period sekali saja, tanpa filter ulang frame per window
+    day = df["DATE_ID"].dt.normalize()
+    period = np.select(
+        [
+            day.between(pd.Timestamp(window_a[0]), pd.Timestamp(window_a[1])),
+            day.between(pd.Timestamp(window_b[0]), pd.Timestamp(window_b[1])),
+        ],
+        ["A","B"],
+        default=""
+    )
+
+    df_p = df[kpis + keys].assign(PERIOD=period, DAY=day)
+    df_p = df_p[df_p["PERIOD"] != ""]
+
+    # nilai harian per entity -> mean/std/count per period
+    daily = df_p.groupby(keys + ["PERIOD","DAY"], observed=True)[kpis].mean().astype("float64")
+    stats = daily.groupby(level=keys + ["PERIOD"], observed=True).agg(["mean","std","count"])
+
+    stats.columns.names = ["KPI","STAT"]
+    stats = stats.stack("KPI", future_stack=True).unstack("PERIOD")
+    stats.columns = [f"{stat}_{p}" for stat, p in stats.columns]
+
+    for col in ["mean_A","mean_B","std_A","std_B","count_A","count_B"]:
+        if col not in stats.columns:
+            stats[col] = np.nan
+
+    res = pd.DataFrame(index=stats.index)
+    res["PERIOD_A"] = stats["mean_A"]
+    res["PERIOD_B"] = stats["mean_B"]
+    res["DELTA"] = res["PERIOD_B"] - res["PERIOD_A"]
+    res["DELTA_%"] = 100 * res["DELTA"] / res["PERIOD_A"].abs()
+
+    # Welch t-test dari nilai harian, signifikan di 95% (two-sided)
+    var_a = stats["std_A"] ** 2 / stats["count_A"]
+    var_b = stats["std_B"] ** 2 / stats["count_B"]
+    t_stat = res["DELTA"] / np.sqrt(var_a + var_b)
+    dof = (var_a + var_b) ** 2 / (
+        var_a ** 2 / (stats["count_A"] - 1) +
+        var_b ** 2 / (stats["count_B"] - 1)
+    )
+    res["SIGNIFICANT"] = (
+        (t_stat.abs() >= t_critical(dof.to_numpy())) &
+        (stats["count_A"] >= 2) & (stats["count_B"] >= 2)
+    )
+
+    rule = pd.Series(res.index.get_level_values("KPI")).map(KPI_RULE)
+    lower_better = (rule == "max").to_numpy()
+    no_direction = ~rule.isin(["min","max"]).to_numpy()
+    gain = np.where(lower_better, -res["DELTA"], res["DELTA"])
+
+    # KPI tanpa arah (traffic, user) cuma naik/turun, bukan better/worse
+    res["TREND"] = np.select(
+        [
+            ~res["SIGNIFICANT"],
+            no_direction & (res["DELTA"] > 0), no_direction & (res["DELTA"] < 0),
+            gain > 0, gain < 0
+        ],
+        ["~ Not Significant", "▲ Up", "▼ Down", "▲ Better", "▼ Worse"],
+        default="= No Change"
+    )
+
+    target = build_target_lookup(df, keys, kpis, target_df)
+    if target is not None:
+        res["TARGET"] = target.reindex(res.index)
+    else:
+        res["TARGET"] = np.nan
+
+    ok_a = np.where(lower_better, res["PERIOD_A"] <= res["TARGET"], res["PERIOD_A"] >= res["TARGET"])
+    ok_b = np.where(lower_better, res["PERIOD_B"] <= res["TARGET"], res["PERIOD_B"] >= res["TARGET"])
+    no_sla = res[["TARGET","PERIOD_A","PERIOD_B"]].isna().any(axis=1).to_numpy() | no_direction
+
+    res["SLA_FLAG"] = np.select(
+        [no_sla, ~ok_a & ok_b, ok_a & ~ok_b, ~ok_a & ~ok_b],
+        ["-", "✅ Fixed", "❌ Degraded", "⚠️ Still NOK"],
+        default="OK"
+    )
+
+    return res.reset_index()
+
+
+# ================= WORST CELLS =================
+def rank_worst_cells(df, kpis, target_df, top_n):
+
+    # KPI tanpa arah bagus/jelek (traffic, user) tidak bisa diranking "worst"
+    kpis = [k for k in numeric_kpis(df, kpis) if KPI_RULE.get(k) in ["min","max"]]
+
+    if not kpis:
+        return pd.DataFrame(columns=["KPI","RANK","CELL_NAME","VALUE","TARGET","GAP"])
+
+    df_cell = df.groupby("CELL_NAME", observed=True)[kpis].mean().astype("float64")
+
+    target = build_target_lookup(df, ["CELL_NAME"], kpis, target_df)
+    target = target.unstack("KPI") if target is not None else pd.DataFrame(index=df_cell.index)
+
+    rows = []
+
+    for kpi in kpis:
+
+        lower_better = KPI_RULE[kpi] == "max"
+
+        value = df_cell[kpi]
+        th = target[kpi].reindex(value.index) if kpi in target.columns else pd.Series(np.nan, index=value.index)
+        gap = value - th if lower_better else th - value
+
+        # GAP > 0 = gagal SLA. Urutan: cell gagal SLA, lalu cell tanpa target
+        # (diranking dari nilai KPI), terakhir cell yang lolos SLA
+        candidates = (
+            (
+                (1, v if lower_better else -v) if pd.isna(g) else (2 if g > 0 else 0, g),
+                cell, v, t, g
+            )
+            for cell, v, t, g in zip(value.index, value.to_numpy(), th.to_numpy(), gap.to_numpy())
+            if pd.notna(v)
+        )
+
+        worst = heapq.nlargest(top_n, candidates, key=lambda c: c[0])
+
+        for rank, (_, cell, v, t, g) in enumerate(worst, start=1):
+            rows.append({
+                "KPI": kpi, "RANK": rank, "CELL_NAME": cell,
+                "VALUE": v, "TARGET": t, "GAP": g
+            })
+
+    return pd.DataFrame(rows, columns=["KPI","RANK","CELL_NAME","VALUE","TARGET","GAP"])
 
 
 # ================= MAIN =================
@@ -291,14 +653,22 @@ if st.sidebar.button("Logout"):
 
 layout_mode = st.sidebar.radio(
     "Layout Mode",
-    ["Sector Combine","Band Matrix","Summary","Payload Stack","Site KPI Dashboard"]
+    ["Sector Combine","Band Matrix","Summary","Payload Stack","Site KPI Dashboard","Busy Hour","Period Compare","Worst Cells"]
 )
 
 kab_df, target_df = load_sla_master()
 
 if uploaded:
 
-    df = load_data(uploaded)
+    df, mem_report = load_data(uploaded)
+
+    with st.sidebar.expander("🧠 Memory Report"):
+        total = mem_report.loc["TOTAL"]
+        st.caption(
+            f"{total['Before (MB)']:.2f} MB → {total['After (MB)']:.2f} MB "
+            f"(hemat {total['Saving (%)']:.1f}%)"
+        )
+        st.dataframe(mem_report, use_container_width=True)
 
     summary_kpi = [
         "RRC Setup Success Rate (Service)",
@@ -346,16 +716,31 @@ if uploaded:
         df_filtered = df[df["SITE_ID"].isin(selected_sites)]
 
         if kab_df is not None:
-            df_filtered = df_filtered.merge(
-                kab_df, left_on="SITE_ID", right_on="SiteID", how="left"
+            # map per kategori SITE_ID, bukan merge (merge balikin SITE_ID jadi string per baris)
+            df_filtered["KABUPATEN"] = (
+                df_filtered["SITE_ID"]
+                .map(kab_df.set_index("SiteID")["KABUPATEN"])
+                .astype("category")
             )
 
+        df_filtered = drop_unused_categories(df_filtered)
+
+        # plotly baru di-import saat layout chart dibuka,
+        # login / upload / Summary tidak perlu menunggu
+        if layout_mode != "Summary":
+            import plotly.express as px
+
 
         # ================= CHART =================
         if layout_mode in ["Sector Combine","Band Matrix"]:
 
             sectors = ["SEC1","SEC2","SEC3"]
 
+            top_n_trace = st.sidebar.number_input(
+                "Top-N Worst Cells per Sector (0 = all)", min_value=0, value=0, step=1
+            )
+            worst_cells = {}
+
             for kpi in kpi_list:
 
                 st.markdown("---")
@@ -372,10 +757,20 @@ if uploaded:
                             if df_sec.empty:
                                 continue
 
-                            df_g = df_sec.groupby(["CELL_NAME","DATE_ID"]).mean(numeric_only=True).reset_index()
+                            df_g = df_sec.groupby(["CELL_NAME","DATE_ID"], observed=True).mean(numeric_only=True).reset_index()
                             if kpi not in df_g.columns:
                                 continue
 
+                            if top_n_trace > 0:
+                                if sec not in worst_cells:
+                                    worst_cells[sec] = rank_worst_cells(df_sec, kpi_list, target_df, top_n_trace)
+                                df_rank = worst_cells[sec]
+                                cells = df_rank.loc[df_rank["KPI"] == kpi, "CELL_NAME"]
+                                if kpi not in set(df_rank["KPI"]):
+                                    # KPI tanpa arah (traffic/user): ambil N cell terbesar
+                                    cells = df_g.groupby("CELL_NAME", observed=True)[kpi].mean().nlargest(top_n_trace).index
+                                df_g = df_g[df_g["CELL_NAME"].isin(cells)]
+
                             fig = px.line(df_g, x="DATE_ID", y=kpi, color="CELL_NAME")
 
                             th = get_sla_threshold(df_sec, kpi, target_df)
@@ -410,10 +805,20 @@ if uploaded:
                                 if df_sec.empty:
                                     continue
 
-                                df_g = df_sec.groupby(["CELL_NAME","DATE_ID"]).mean(numeric_only=True).reset_index()
+                                df_g = df_sec.groupby(["CELL_NAME","DATE_ID"], observed=True).mean(numeric_only=True).reset_index()
                                 if kpi not in df_g.columns:
                                     continue
 
+                                if top_n_trace > 0:
+                                    if (band, sec) not in worst_cells:
+                                        worst_cells[(band, sec)] = rank_worst_cells(df_sec, kpi_list, target_df, top_n_trace)
+                                    df_rank = worst_cells[(band, sec)]
+                                    cells = df_rank.loc[df_rank["KPI"] == kpi, "CELL_NAME"]
+                                    if kpi not in set(df_rank["KPI"]):
+                                        # KPI tanpa arah (traffic/user): ambil N cell terbesar
+                                        cells = df_g.groupby("CELL_NAME", observed=True)[kpi].mean().nlargest(top_n_trace).index
+                                    df_g = df_g[df_g["CELL_NAME"].isin(cells)]
+
                                 fig = px.line(df_g, x="DATE_ID", y=kpi, color="CELL_NAME")
 
                                 th = get_sla_threshold(df_sec, kpi, target_df)
@@ -478,11 +883,6 @@ if uploaded:
 
             nok_found = False
 
-            kpi_rule = {
-                "Session_Abnormal_Release_New": "max",
-                "UL_INT_PUSCH": "max",
-            }
-
             for kpi in summary_kpi:
 
                 if kpi not in df_filtered.columns:
@@ -525,7 +925,7 @@ if uploaded:
 
                 if target is not None and pd.notna(avg_val):
 
-                    rule = kpi_rule.get(kpi, "min")
+                    rule = KPI_RULE.get(kpi, "min")
 
                     if rule == "max":
                         passed = "Y" if avg_val <= target else "N"
@@ -556,7 +956,7 @@ if uploaded:
             st.header("📦 Total Traffic Volume (GB)")
 
             df_grouped = (
-                df_filtered.groupby(["DATE_ID","SITE_ID"])["Total_Traffic_Volume_new"]
+                df_filtered.groupby(["DATE_ID","SITE_ID"], observed=True)["Total_Traffic_Volume_new"]
                 .sum()
                 .reset_index()
             )
@@ -581,13 +981,13 @@ if uploaded:
             df_payload["Total_Traffic_Volume_new"] /= 1024
             
             # Band jadi L1800, dll
-            df_payload["Band"] = "L" + df_payload["Band"].fillna("").astype(str)
+            df_payload["Band"] = df_payload["Band"].cat.rename_categories(lambda b: f"L{b}")
             
             # ================= LAYER =================
-            df_payload["LAYER"] = df_payload["CELL_NAME"].apply(detect_layer)
+            df_payload["LAYER"] = df_payload["CELL_NAME"].map(detect_layer).astype(object)
             
             # ================= COMBINE BAND + LAYER =================
-            df_payload["Band_Layer"] = df_payload["Band"].copy()
+            df_payload["Band_Layer"] = df_payload["Band"].astype(object)
             
             mask_23 = df_payload["Band"] == "L2300"
             
@@ -596,7 +996,8 @@ if uploaded:
             df_payload.loc[mask_23, "Band_Layer"] = (
                 df_payload.loc[mask_23, "Band"].astype(str) + "_" +
                 df_payload.loc[mask_23, "LAYER"].astype(str)
-            )            
+            )
+            df_payload["Band_Layer"] = df_payload["Band_Layer"].astype("category")
             # OPTIONAL (hapus yang ga punya layer di L2300)
             df_payload = df_payload[
                 (df_payload["Band"] != "L2300") | (df_payload["LAYER"].notna())
@@ -619,14 +1020,14 @@ if uploaded:
                         continue
             
                     df_plot = (
-                        df_sec.groupby(["DATE_ID","Band_Layer"])["Total_Traffic_Volume_new"]
+                        df_sec.groupby(["DATE_ID","Band_Layer"], observed=True)["Total_Traffic_Volume_new"]
                         .sum()
                         .reset_index()
                     )
             
                     order = sorted(
                         df_plot["Band_Layer"].dropna().unique(),
-                        key=lambda x: int(re.findall(r'\d+', x)[0])
+                        key=lambda x: int(RE_DIGITS.search(x).group(1))
                     )
                     
                     fig = px.area(
@@ -650,14 +1051,14 @@ if uploaded:
                 st.markdown("### Band - Total")
 
                 df_total_band = (
-                    df_payload.groupby(["DATE_ID","Band_Layer"])["Total_Traffic_Volume_new"]
+                    df_payload.groupby(["DATE_ID","Band_Layer"], observed=True)["Total_Traffic_Volume_new"]
                     .sum()
                     .reset_index()
                 )
 
                 order_total = sorted(
                     df_total_band["Band_Layer"].dropna().unique(),
-                    key=lambda x: int(re.findall(r'\d+', x)[0])
+                    key=lambda x: int(RE_DIGITS.search(x).group(1))
                 )
                 
                 fig_total = px.area(
@@ -678,7 +1079,7 @@ if uploaded:
                 st.markdown("### By Band - Data Details")
 
                 df_table = (
-                    df_payload.groupby(["DATE_ID","Band_Layer"])["Total_Traffic_Volume_new"]
+                    df_payload.groupby(["DATE_ID","Band_Layer"], observed=True)["Total_Traffic_Volume_new"]
                     .sum()
                     .reset_index()
                     .pivot(index="DATE_ID", columns="Band_Layer", values="Total_Traffic_Volume_new")
@@ -700,7 +1101,7 @@ if uploaded:
             th = get_sla_site_worst(df_filtered, kpi_selected, target_df)
 
             df_site = (
-                df_filtered.groupby(["SITE_ID","DATE_ID"])[kpi_selected]
+                df_filtered.groupby(["SITE_ID","DATE_ID"], observed=True)[kpi_selected]
                 .mean()
                 .reset_index()
             )
@@ -752,3 +1153,218 @@ if uploaded:
 
             df_table = df_site.pivot(index="DATE_ID", columns="SITE_ID", values=kpi_selected)
             st.dataframe(df_table)
+
+        # ================= BUSY HOUR =================
+        elif layout_mode == "Busy Hour":
+
+            st.header("⏰ Busy Hour KPI")
+
+            if "Hour_id" not in df_filtered.columns:
+                st.warning("⚠️ Busy Hour butuh data hourly (kolom Hour_id)")
+                st.stop()
+
+            if BH_TRAFFIC_KPI not in df_filtered.columns:
+                st.warning(f"⚠️ Kolom {BH_TRAFFIC_KPI} tidak ada")
+                st.stop()
+
+            bh_level = st.radio("Busy Hour Level", ["SITE_ID","CELL_NAME"], horizontal=True)
+            kpi_selected = st.selectbox("Select KPI", kpi_list)
+
+            df_bh = compute_busy_hour(df_filtered, bh_level, kpi_list)
+
+            if df_bh.empty or kpi_selected not in df_bh.columns:
+                st.warning("⚠️ No busy hour data")
+                st.stop()
+
+            th = get_sla_site_worst(df_filtered, kpi_selected, target_df)
+
+            st.markdown("### 📈 KPI @ Busy Hour")
+
+            fig = px.line(
+                df_bh, x="DATE_ID", y=kpi_selected, color=bh_level,
+                hover_data=["BUSY_HOUR"]
+            )
+
+            if pd.notna(th):
+                fig.add_hline(y=float(th), line_dash="dash", line_color="red")
+
+            st.plotly_chart(apply_universal_legend(fig), use_container_width=True)
+
+            col1, col2 = st.columns(2)
+
+            with col1:
+                st.markdown("### 🕐 Busy Hour per Day")
+                st.dataframe(
+                    df_bh.pivot(index="DATE_ID", columns=bh_level, values="BUSY_HOUR"),
+                    use_container_width=True
+                )
+
+            with col2:
+                st.markdown(f"### 📋 {kpi_selected} @ Busy Hour")
+                st.dataframe(
+                    df_bh.pivot(index="DATE_ID", columns=bh_level, values=kpi_selected).round(2),
+                    use_container_width=True
+                )
+
+            # ================= HEATMAP =================
+            st.markdown("---")
+            st.markdown("### 🔥 Hour x Day Heatmap")
+
+            df_heat = busy_hour_heatmap(df_filtered, kpi_selected)
+            df_heat.columns = [d.strftime('%d-%b-%y') for d in df_heat.columns]
+
+            fig_heat = px.imshow(
+                df_heat,
+                aspect="auto",
+                color_continuous_scale="Viridis",
+                labels=dict(x="DATE_ID", y="Hour_id", color=kpi_selected)
+            )
+            fig_heat.update_yaxes(dtick=1, autorange="reversed")
+
+            st.plotly_chart(fig_heat, use_container_width=True)
+
+        # ================= PERIOD COMPARE =================
+        elif layout_mode == "Period Compare":
+
+            st.header("🔀 Period Compare")
+
+            days = sorted(df_filtered["DATE_ID"].dt.normalize().dropna().unique())
+
+            if len(days) < 2:
+                st.warning("⚠️ Butuh minimal 2 hari data untuk compare")
+                st.stop()
+
+            first_day = days[0].date()
+            last_day = days[-1].date()
+            mid_day = days[len(days) // 2 - 1].date()
+            next_day = days[len(days) // 2].date()
+
+            col1, col2 = st.columns(2)
+
+            with col1:
+                window_a = st.date_input(
+                    "Period A (Before)", (first_day, mid_day),
+                    min_value=first_day, max_value=last_day
+                )
+
+            with col2:
+                window_b = st.date_input(
+                    "Period B (After)", (next_day, last_day),
+                    min_value=first_day, max_value=last_day
+                )
+
+            if len(window_a) != 2 or len(window_b) != 2:
+                st.info("Pilih tanggal awal dan akhir untuk kedua period")
+                st.stop()
+
+            if window_a[0] <= window_b[1] and window_b[0] <= window_a[1]:
+                st.warning("⚠️ Period A dan Period B tidak boleh overlap")
+                st.stop()
+
+            compare_level = st.radio("Compare Level", ["Overall","SITE_ID","CELL_NAME"], horizontal=True)
+            only_significant = st.checkbox("Show Only Significant Change", value=False)
+
+            keys = [] if compare_level == "Overall" else [compare_level]
+
+            df_cmp = compute_period_compare(
+                df_filtered, keys, kpi_list, window_a, window_b, target_df
+            )
+
+            if compare_level != "Overall":
+                kpi_selected = st.selectbox("Select KPI", kpi_list)
+                df_cmp = df_cmp[df_cmp["KPI"] == kpi_selected]
+
+            if only_significant:
+                df_cmp = df_cmp[df_cmp["SIGNIFICANT"]]
+
+            if df_cmp.empty:
+                if only_significant:
+                    st.success("✅ No significant change")
+                else:
+                    st.warning("⚠️ No data in selected periods")
+                st.stop()
+
+            if compare_level != "Overall":
+
+                fig = px.bar(
+                    df_cmp.sort_values("DELTA"),
+                    x=compare_level, y="DELTA", color="TREND",
+                    hover_data=["PERIOD_A","PERIOD_B","TARGET","SLA_FLAG"]
+                )
+
+                st.plotly_chart(apply_universal_legend(fig), use_container_width=True)
+
+            st.dataframe(
+                df_cmp.round(2).set_index(keys + ["KPI"]),
+                use_container_width=True
+            )
+
+        # ================= WORST CELLS =================
+        elif layout_mode == "Worst Cells":
+
+            st.header("🚨 Top-N Worst Cells")
+
+            top_n = st.slider("Top-N", min_value=1, max_value=50, value=10)
+
+            df_rank = rank_worst_cells(df_filtered, kpi_list, target_df, top_n)
+
+            if df_rank.empty:
+                st.warning("⚠️ No data")
+                st.stop()
+
+            kpi_selected = st.selectbox("Select KPI", ["ALL"] + list(df_rank["KPI"].unique()))
+
+            if kpi_selected == "ALL":
+                st.dataframe(
+                    df_rank.round(2).set_index(["KPI","RANK"]),
+                    use_container_width=True
+                )
+                st.stop()
+
+            df_rank = df_rank[df_rank["KPI"] == kpi_selected]
+
+            if df_rank.empty:
+                st.warning(f"⚠️ No data for {kpi_selected}")
+                st.stop()
+
+            col1, col2 = st.columns([2,1])
+
+            with col1:
+                st.markdown("### 📉 Gap to SLA")
+
+                fig = px.bar(
+                    df_rank,
+                    x="CELL_NAME",
+                    y="GAP" if df_rank["GAP"].notna().any() else "VALUE",
+                    hover_data=["VALUE","TARGET"]
+                )
+
+                st.plotly_chart(fig, use_container_width=True)
+
+            with col2:
+                st.markdown("### 📋 Ranking")
+                st.dataframe(
+                    df_rank.drop(columns="KPI").round(2).set_index("RANK"),
+                    use_container_width=True
+                )
+
+            st.markdown("### 📈 KPI Trend (Worst Cells)")
+
+            df_worst = df_filtered[df_filtered["CELL_NAME"].isin(df_rank["CELL_NAME"])]
+
+            df_g = (
+                df_worst.groupby(["CELL_NAME","DATE_ID"], observed=True)[kpi_selected]
+                .mean()
+                .reset_index()
+            )
+
+            fig = px.line(
+                df_g, x="DATE_ID", y=kpi_selected, color="CELL_NAME",
+                category_orders={"CELL_NAME": list(df_rank["CELL_NAME"])}
+            )
+
+            th = get_sla_site_worst(df_filtered, kpi_selected, target_df)
+            if pd.notna(th):
+                fig.add_hline(y=float(th), line_dash="dash", line_color="red")
+
+            st.plotly_chart(apply_universal_legend(fig), use_container_width=True)